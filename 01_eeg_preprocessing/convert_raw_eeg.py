@@ -0,0 +1,41 @@
+"""Converting the raw EEG data dictionaries of all sessions and data
+partitions into float64 EEG data arrays with separate JSON metadata. The
+preprocessing then memory-maps these arrays, so that only the selected EEG
+channels are read into memory.
+
+Parameters
+----------
+sub : int
+	Used subject.
+n_ses : int
+	Number of EEG sessions.
+project_dir : str
+	Directory of the project folder.
+
+"""
+
+import argparse
+from preprocessing_utils import convert_raw_eeg
+
+
+# =============================================================================
+# Input arguments
+# =============================================================================
+parser = argparse.ArgumentParser()
+parser.add_argument('--sub', default=1, type=int)
+parser.add_argument('--n_ses', default=4, type=int)
+parser.add_argument('--project_dir', default='/project/directory', type=str)
+args = parser.parse_args()
+
+print('>>> Raw EEG data conversion <<<')
+print('\nInput arguments:')
+for key, val in vars(args).items():
+	print('{:16} {}'.format(key, val))
+
+
+# =============================================================================
+# Converting the raw EEG data
+# =============================================================================
+for data_part in ['test', 'training']:
+	for s in range(args.n_ses):
+		convert_raw_eeg(args, data_part, s)
@@ -3,6 +3,8 @@ downsampling, baseline correction, multivariate noise normalization (MVNN),
 sorting of the data conditions and reshaping the data to:
 Image conditions × EEG repetitions × EEG channels × EEG time points.
 Then, the data of both test and training EEG partitions is saved.
+If the raw EEG data was converted with "convert_raw_eeg.py", the float64 raw
+EEG data arrays are memory-mapped instead of fully loaded.
 
 Parameters
 ----------
@@ -15,13 +17,16 @@ sfreq : int
 mvnn_dim : str
 	Whether to compute the MVNN covariace matrices for each time point
 	('time') or for each epoch/repetition ('epochs').
+n_jobs : int
+	Number of EEG sessions processed in parallel (-1 uses all CPU cores).
+device : str
+	Whether to compute the MVNN whitening on the 'cpu' or on the GPU ('cuda').
 project_dir : str
 	Directory of the project folder.
 
 """
 
 import argparse
-import numpy as np
 from preprocessing_utils import epoching
 from preprocessing_utils import mvnn
 from preprocessing_utils import save_prepr
@@ -35,6 +40,9 @@ parser.add_argument('--sub', default=1, type=int)
 parser.add_argument('--n_ses', default=4, type=int)
 parser.add_argument('--sfreq', default=100, type=int)
 parser.add_argument('--mvnn_dim', default='time', type=str)
+parser.add_argument('--n_jobs', default=1, type=int)
+parser.add_argument('--device', default='cpu', type=str,
+	choices=['cpu','cuda'])
 parser.add_argument('--project_dir', default='/project/directory', type=str)
 args = parser.parse_args()
 
@@ -43,9 +51,6 @@ print('\nInput arguments:')
 for key, val in vars(args).items():
 	print('{:16} {}'.format(key, val))
 
-# Set random seed for reproducible results
-np.random.seed(seed=20200220)
-
 
 # =============================================================================
 # Epoching and sorting the data
@@ -2,7 +2,8 @@ def epoching(args, data_part):
 	"""This function first converts the EEG data to MNE raw format, and
 	performs channel selection, epoching, baseline correction and frequency
 	downsampling. Then, it sorts the EEG data of each session according to the
-	image conditions.
+	image conditions. The sessions are optionally processed in parallel (see
+	n_jobs).
 
 	Parameters
 	----------
@@ -24,82 +25,298 @@ def epoching(args, data_part):
 
 	"""
 
+	from joblib import Parallel, delayed
+
+	### Looping across data collection sessions ###
+	results = Parallel(n_jobs=args.n_jobs)(delayed(epoching_session)(args,
+		data_part, s) for s in range(args.n_ses))
+	epoched_data = [res[0] for res in results]
+	img_conditions = [res[1] for res in results]
+	ch_names = results[-1][2]
+	times = results[-1][3]
+	del results
+
+	### Output ###
+	return epoched_data, img_conditions, ch_names, times
+
+
+def epoching_session(args, data_part, s):
+	"""Epoching and sorting the EEG data of a single data collection session
+	(see "epoching"). The raw EEG data is either loaded from the
+	"raw_eeg_<data_part>.npy" dictionary, or, if available, memory-mapped from
+	the "raw_eeg_<data_part>_data.npy" array (EEG channels × EEG time points)
+	with its "raw_eeg_<data_part>_meta.json" metadata ('ch_names', 'sfreq' and
+	'ch_types'), as written by "convert_raw_eeg". The array must be stored as
+	float64, otherwise MNE converts the whole array in memory.
+
+	Parameters
+	----------
+	args : Namespace
+		Input arguments.
+	data_part : str
+		'test' or 'training' data partitions.
+	s : int
+		Data collection session index.
+
+	Returns
+	-------
+	sorted_data : float32
+		Epoched and sorted EEG data.
+	img_cond : int
+		Unique image conditions of the epoched and sorted EEG data.
+	ch_names : list of str
+		EEG channel names.
+	times : float
+		EEG time points.
+
+	"""
+
 	import os
+	import json
 	import mne
 	import numpy as np
-	from sklearn.utils import shuffle
 
-	# Set random seed for reproducible results
-	np.random.seed(seed=20200220)
+	# Random generator with a fixed seed for reproducible results
+	# (independently of the order in which the sessions are processed)
+	rng = np.random.default_rng(seed=20200220+s)
 
-	### Looping across data collection sessions ###
-	epoched_data = []
-	img_conditions = []
-	for s in range(args.n_ses):
-
-		### Loading the EEG data and converting it to MNE raw format ###
-		eeg_dir = os.path.join('eeg_dataset', 'raw_data', 'sub-'+
-			format(args.sub,'02'), 'ses-'+format(s+1,'02'), 'raw_eeg_'+
-			data_part+'.npy')
-		eeg_data = np.load(os.path.join(args.project_dir, eeg_dir),
+	### Loading the EEG data and converting it to MNE raw format ###
+	eeg_dir = os.path.join(args.project_dir, 'eeg_dataset', 'raw_data',
+		'sub-'+format(args.sub,'02'), 'ses-'+format(s+1,'02'))
+	data_file = os.path.join(eeg_dir, 'raw_eeg_'+data_part+'_data.npy')
+	meta_file = os.path.join(eeg_dir, 'raw_eeg_'+data_part+'_meta.json')
+	if os.path.isfile(data_file) and os.path.isfile(meta_file):
+		# If the EEG data array and its metadata are stored in separate files,
+		# the array is memory-mapped, so that only the selected channels are
+		# eventually read into memory
+		with open(meta_file) as f:
+			eeg_meta = json.load(f)
+		ch_names = eeg_meta['ch_names']
+		sfreq = eeg_meta['sfreq']
+		ch_types = eeg_meta['ch_types']
+		eeg_data = np.load(data_file, mmap_mode='r')
+	else:
+		eeg_data = np.load(os.path.join(eeg_dir, 'raw_eeg_'+data_part+'.npy'),
 			allow_pickle=True).item()
 		ch_names = eeg_data['ch_names']
 		sfreq = eeg_data['sfreq']
 		ch_types = eeg_data['ch_types']
 		eeg_data = eeg_data['raw_eeg_data']
-		# Converting to MNE raw format
-		info = mne.create_info(ch_names, sfreq, ch_types)
-		raw = mne.io.RawArray(eeg_data, info)
-		del eeg_data
-
-		### Get events, drop unused channels and reject target trials ###
-		events = mne.find_events(raw, stim_channel='stim')
-		# Selecting only occipital (O) and posterior (P) channels
-		chan_idx = np.asarray(mne.pick_channels_regexp(raw.info['ch_names'],
-			'^O *|^P *'))
-		new_chans = [raw.info['ch_names'][c] for c in chan_idx]
-		raw.pick_channels(new_chans)
-		# Rejecting the target trials (event 99999)
-		idx_target = np.where(events[:,2] == 99999)[0]
-		events = np.delete(events, idx_target, 0)
-
-		### Epoching, baseline correcting and resampling ###
-		epochs = mne.Epochs(raw, events, tmin=-.2, tmax=.8, baseline=(None,0),
-			preload=True)
-		del raw
-		# Resampling
-		if args.sfreq < 1000:
-			epochs.resample(args.sfreq)
-		ch_names = epochs.info['ch_names']
-		times = epochs.times
-
-		### Sorting the data ###
-		data = epochs.get_data()
-		events = epochs.events[:,2]
-		img_cond = np.unique(events)
-		del epochs
-		# Selecting only a maximum number of EEG repetitions
-		if data_part == 'test':
-			max_rep = 20
-		else:
-			max_rep = 2
-		# Sorted data matrix of shape:
-		# Image conditions × EEG repetitions × EEG channels × EEG time points
-		sorted_data = np.zeros((len(img_cond),max_rep,data.shape[1],
-			data.shape[2]))
-		for i in range(len(img_cond)):
-			# Finding the indices of the selected image condition
-			idx = np.where(events == img_cond[i])[0]
-			# Randomly selecting only the max number of EEG repetitions
-			idx = shuffle(idx)[:max_rep]
-			sorted_data[i] = data[idx]
-		del data
-		epoched_data.append(sorted_data)
-		img_conditions.append(img_cond)
-		del sorted_data
+	# Converting to MNE raw format
+	info = mne.create_info(ch_names, sfreq, ch_types)
+	raw = mne.io.RawArray(eeg_data, info)
+	del eeg_data
+
+	### Get events, drop unused channels and reject target trials ###
+	events = mne.find_events(raw, stim_channel='stim')
+	# Selecting only occipital (O) and posterior (P) channels
+	chan_idx = np.asarray(mne.pick_channels_regexp(raw.info['ch_names'],
+		'^O *|^P *'))
+	new_chans = [raw.info['ch_names'][c] for c in chan_idx]
+	raw.pick_channels(new_chans)
+	# Rejecting the target trials (event 99999)
+	idx_target = np.where(events[:,2] == 99999)[0]
+	events = np.delete(events, idx_target, 0)
+
+	### Epoching, baseline correcting and resampling ###
+	epochs = mne.Epochs(raw, events, tmin=-.2, tmax=.8, baseline=(None,0),
+		preload=True)
+	del raw
+	# Resampling
+	if args.sfreq < 1000:
+		epochs.resample(args.sfreq)
+	ch_names = epochs.info['ch_names']
+	times = epochs.times
+
+	### Sorting the data ###
+	# Single precision and contiguous memory layout are used from here on
+	data = np.ascontiguousarray(epochs.get_data(), dtype=np.float32)
+	events = epochs.events[:,2]
+	img_cond, cond_idx, cond_counts = np.unique(events, return_inverse=True,
+		return_counts=True)
+	del epochs
+	# Selecting only a maximum number of EEG repetitions
+	if data_part == 'test':
+		max_rep = 20
+	else:
+		max_rep = 2
+	if np.any(cond_counts < max_rep):
+		raise ValueError('Some image conditions have less than '+
+			str(max_rep)+' EEG repetitions')
+	# Randomly ordering the epochs within each image condition (with a single
+	# sort of the image conditions and of random keys), and selecting the
+	# first max number of EEG repetitions of each image condition
+	order = np.lexsort((rng.random(len(events)), cond_idx))
+	cond_start = np.cumsum(cond_counts) - cond_counts
+	idx = order[cond_start[:,np.newaxis]+np.arange(max_rep)]
+	# Sorted data matrix of shape:
+	# Image conditions × EEG repetitions × EEG channels × EEG time points
+	sorted_data = data[idx]
+	del data, order, idx
 
 	### Output ###
-	return epoched_data, img_conditions, ch_names, times
+	return sorted_data, img_cond, ch_names, times
+
+
+def convert_raw_eeg(args, data_part, s):
+	"""Converting the raw EEG data dictionary of a single data collection
+	session ("raw_eeg_<data_part>.npy") into a float64 EEG data array
+	("raw_eeg_<data_part>_data.npy", EEG channels × EEG time points) and its
+	metadata ("raw_eeg_<data_part>_meta.json": 'ch_names', 'sfreq' and
+	'ch_types'), which "epoching_session" memory-maps.
+
+	Parameters
+	----------
+	args : Namespace
+		Input arguments.
+	data_part : str
+		'test' or 'training' data partitions.
+	s : int
+		Data collection session index.
+
+	"""
+
+	import os
+	import json
+	import numpy as np
+
+	### Loading the EEG data dictionary ###
+	eeg_dir = os.path.join(args.project_dir, 'eeg_dataset', 'raw_data',
+		'sub-'+format(args.sub,'02'), 'ses-'+format(s+1,'02'))
+	eeg_data = np.load(os.path.join(eeg_dir, 'raw_eeg_'+data_part+'.npy'),
+		allow_pickle=True).item()
+
+	### Saving the EEG data array and its metadata ###
+	eeg_meta = {
+		'ch_names': [str(ch) for ch in eeg_data['ch_names']],
+		'sfreq': float(eeg_data['sfreq']),
+		'ch_types': [str(ch) for ch in eeg_data['ch_types']]
+	}
+	with open(os.path.join(eeg_dir, 'raw_eeg_'+data_part+'_meta.json'),
+		'w') as f:
+		json.dump(eeg_meta, f)
+	np.save(os.path.join(eeg_dir, 'raw_eeg_'+data_part+'_data.npy'),
+		np.asarray(eeg_data['raw_eeg_data'], dtype=np.float64))
+	del eeg_data
+
+
+def shrinkage_cov(data):
+	"""Computing the Ledoit-Wolf shrunk covariance matrices of a batch of
+	EEG data slices at once. This reproduces sklearn's
+	"_cov(X, shrinkage='auto')" (features standardization, Ledoit-Wolf
+	shrinkage, rescaling), but with batched matrix products instead of one
+	Python call per slice.
+
+	Parameters
+	----------
+	data : float
+		EEG data of shape: (Batch dimensions) × Samples × EEG channels.
+
+	Returns
+	-------
+	sigma : float
+		Shrunk covariance matrices of shape:
+		(Batch dimensions) × EEG channels × EEG channels.
+
+	"""
+
+	import numpy as np
+
+	n_samples, n_feat = data.shape[-2:]
+
+	### Standardizing the data ###
+	# The covariance matrices are estimated in double precision
+	data = data.astype(np.float64)
+	data -= data.mean(axis=-2, keepdims=True)
+	scale = np.sqrt(np.mean(data**2, axis=-2))
+	scale[scale == 0] = 1
+	data = data / scale[...,np.newaxis,:]
+
+	### Empirical covariance and Ledoit-Wolf shrinkage intensity ###
+	emp_cov = np.matmul(data.swapaxes(-1,-2), data) / n_samples
+	data2 = data ** 2
+	emp_cov_trace = data2.sum(axis=-2) / n_samples
+	mu = emp_cov_trace.sum(axis=-1) / n_feat
+	beta_ = np.matmul(data2.swapaxes(-1,-2), data2).sum(axis=(-2,-1))
+	delta_ = (emp_cov ** 2).sum(axis=(-2,-1))
+	beta = (beta_ / n_samples - delta_) / (n_feat * n_samples)
+	delta = (delta_ - 2 * mu * emp_cov_trace.sum(axis=-1) +
+		n_feat * mu ** 2) / n_feat
+	beta = np.minimum(beta, delta)
+	shrinkage = np.divide(beta, delta, out=np.zeros_like(beta),
+		where=beta!=0)
+
+	### Shrinking and rescaling the covariance matrices ###
+	sigma = (1 - shrinkage)[...,np.newaxis,np.newaxis] * emp_cov
+	diag = np.arange(n_feat)
+	sigma[...,diag,diag] += (shrinkage * mu)[...,np.newaxis]
+	sigma *= scale[...,:,np.newaxis] * scale[...,np.newaxis,:]
+
+	### Output ###
+	return sigma
+
+
+def inverse_sqrtm(sigma, tol=1e-10, max_iter=100):
+	"""Computing the inverse square root of a symmetric positive definite
+	matrix with the coupled Newton-Schulz iteration. The iteration only
+	involves matrix products, so it works with both numpy arrays and (GPU)
+	torch tensors. The matrix is first scaled by its Frobenius norm (spectrum in
+	(0, 1]), and machine epsilon is added to the diagonal of the scaled matrix,
+	which keeps the iteration well defined without biasing the spectrum
+	relative to its scale.
+
+	Parameters
+	----------
+	sigma : float
+		Symmetric positive definite matrix.
+	tol : float
+		Tolerance on the Frobenius norm of the iteration residual.
+	max_iter : int
+		Maximum number of iterations.
+
+	Returns
+	-------
+	sigma_inv : float
+		Inverse square root of the matrix.
+
+	Raises
+	------
+	LinAlgError
+		If the iteration does not converge within max_iter iterations.
+
+	"""
+
+	import numpy as np
+
+	### Scaling the matrix spectrum into (0, 1] ###
+	if isinstance(sigma, np.ndarray):
+		identity = np.eye(len(sigma), dtype=sigma.dtype)
+		eps = np.finfo(sigma.dtype).eps
+	else:
+		import torch
+		identity = torch.eye(len(sigma), dtype=sigma.dtype,
+			device=sigma.device)
+		eps = torch.finfo(sigma.dtype).eps
+	norm = (sigma ** 2).sum() ** 0.5
+	y = sigma / norm + eps * identity
+
+	### Newton-Schulz iteration ###
+	# "y" converges to the square root and "z" to the inverse square root of
+	# the scaled matrix
+	z = identity
+	for _ in range(max_iter):
+		zy = z @ y
+		if ((identity - zy) ** 2).sum() ** 0.5 < tol:
+			break
+		t = 0.5 * (3 * identity - zy)
+		y = y @ t
+		z = t @ z
+	else:
+		raise np.linalg.LinAlgError('Newton-Schulz iteration for the inverse '
+			'square root of the covariance matrix did not converge')
+
+	### Output ###
+	return z / norm ** 0.5
 
 
 def mvnn(args, epoched_test, epoched_train):
@@ -107,7 +324,8 @@ def mvnn(args, epoched_test, epoched_train):
 	time-point or epoch/repetitions of each image condition), and then averaging
 	them across image conditions and data partitions. The inverse of the
 	resulting averaged covariance matrix is used to whiten the EEG data
-	(independently for each session).
+	(independently for each session). The sessions are optionally processed in
+	parallel (see n_jobs).
 
 	Parameters
 	----------
@@ -127,66 +345,130 @@ def mvnn(args, epoched_test, epoched_train):
 
 	"""
 
-	import numpy as np
-	from tqdm import tqdm
-	from sklearn.discriminant_analysis import _cov
-	import scipy
+	from joblib import Parallel, delayed
 
 	### Looping across data collection sessions ###
-	whitened_test = []
-	whitened_train = []
-	for s in range(args.n_ses):
-		session_data = [epoched_test[s], epoched_train[s]]
-
-		### Computing the covariance matrices ###
-		# Data partitions covariance matrix of shape:
-		# Data partitions × EEG channels × EEG channels
-		sigma_part = np.empty((len(session_data),session_data[0].shape[2],
-			session_data[0].shape[2]))
-		for p in range(sigma_part.shape[0]):
-			# Image conditions covariance matrix of shape:
-			# Image conditions × EEG channels × EEG channels
-			sigma_cond = np.empty((session_data[p].shape[0],
-				session_data[0].shape[2],session_data[0].shape[2]))
-			for i in tqdm(range(session_data[p].shape[0])):
-				cond_data = session_data[p][i]
-				# Computing covariace matrices at each time point, and then
-				# averaging across time points
-				if args.mvnn_dim == "time":
-					sigma_cond[i] = np.mean([_cov(cond_data[:,:,t],
-						shrinkage='auto') for t in range(cond_data.shape[2])],
-						axis=0)
-				# Computing covariace matrices at each epoch (EEG repetition),
-				# and then averaging across epochs/repetitions
-				elif args.mvnn_dim == "epochs":
-					sigma_cond[i] = np.mean([_cov(np.transpose(cond_data[e]),
-						shrinkage='auto') for e in range(cond_data.shape[0])],
-						axis=0)
-			# Averaging the covariance matrices across image conditions
-			sigma_part[p] = sigma_cond.mean(axis=0)
-		# Averaging the covariance matrices across image partitions
-		sigma_tot = sigma_part.mean(axis=0)
-		# Computing the inverse of the covariance matrix
-		sigma_inv = scipy.linalg.fractional_matrix_power(sigma_tot, -0.5)
-
-		### Whitening the data ###
-		whitened_test.append(np.reshape((np.reshape(session_data[0], (-1,
-			session_data[0].shape[2],session_data[0].shape[3])).swapaxes(1, 2)
-			@ sigma_inv).swapaxes(1, 2), session_data[0].shape))
-		whitened_train.append(np.reshape((np.reshape(session_data[1], (-1,
-			session_data[1].shape[2],session_data[1].shape[3])).swapaxes(1, 2)
-				@ sigma_inv).swapaxes(1, 2), session_data[1].shape))
+	results = Parallel(n_jobs=args.n_jobs)(delayed(mvnn_session)(args,
+		[epoched_test[s], epoched_train[s]]) for s in range(args.n_ses))
+	whitened_test = [res[0] for res in results]
+	whitened_train = [res[1] for res in results]
+	del results
 
 	### Output ###
 	return whitened_test, whitened_train
 
 
+def mvnn_session(args, session_data):
+	"""Applying MVNN to the EEG data of a single data collection session
+	(see "mvnn").
+
+	Parameters
+	----------
+	args : Namespace
+		Input arguments.
+	session_data : list of float
+		Epoched test and training EEG data of the session.
+
+	Returns
+	-------
+	whitened_test : float32
+		Whitened test EEG data.
+	whitened_train : float32
+		Whitened training EEG data.
+
+	"""
+
+	import numpy as np
+	from tqdm import tqdm
+	from scipy.linalg.lapack import dsyevd
+
+	### Computing the covariance matrices ###
+	# Data partitions covariance matrix of shape:
+	# Data partitions × EEG channels × EEG channels
+	sigma_part = np.empty((len(session_data),session_data[0].shape[2],
+		session_data[0].shape[2]))
+	# Number of image conditions whose covariance matrices are computed in a
+	# single batch
+	batch_size = 100
+	for p in range(sigma_part.shape[0]):
+		# Image conditions covariance matrix of shape:
+		# Image conditions × EEG channels × EEG channels
+		# (the averaged covariance matrices are written directly into it)
+		sigma_cond = np.empty((session_data[p].shape[0],
+			session_data[0].shape[2],session_data[0].shape[2]))
+		# Looping across batches of image conditions (the progress bar is
+		# disabled when the sessions are processed in parallel)
+		for i in tqdm(range(0, session_data[p].shape[0], batch_size),
+			disable=args.n_jobs!=1):
+			cond_data = session_data[p][i:i+batch_size]
+			# Computing covariace matrices at each time point, and then
+			# averaging across time points
+			if args.mvnn_dim == "time":
+				np.mean(shrinkage_cov(np.transpose(cond_data, (0,3,1,2))),
+					axis=1, out=sigma_cond[i:i+batch_size])
+			# Computing covariace matrices at each epoch (EEG repetition),
+			# and then averaging across epochs/repetitions
+			elif args.mvnn_dim == "epochs":
+				np.mean(shrinkage_cov(np.transpose(cond_data, (0,1,3,2))),
+					axis=1, out=sigma_cond[i:i+batch_size])
+		# Averaging the covariance matrices across image conditions
+		np.mean(sigma_cond, axis=0, out=sigma_part[p])
+		del sigma_cond
+	# Averaging the covariance matrices across image partitions
+	sigma_tot = sigma_part.mean(axis=0)
+	# Computing the inverse square root of the (symmetric positive definite)
+	# covariance matrix. On the GPU it is computed with the Newton-Schulz
+	# iteration (matrix products only), and the whitening matrix is kept on
+	# the GPU for all data partitions
+	if args.device == 'cuda':
+		import torch
+		sigma_inv = inverse_sqrtm(torch.from_numpy(sigma_tot).to(
+			args.device))
+	else:
+		# Direct LAPACK call, avoiding the wrapper overhead of
+		# np.linalg.eigh on this small matrix
+		eig_val, eig_vec, info = dsyevd(sigma_tot, lower=1, overwrite_a=1)
+		if info != 0:
+			raise np.linalg.LinAlgError('Eigendecomposition of the '
+				'covariance matrix did not converge')
+		eig_val = np.maximum(eig_val, np.finfo(eig_val.dtype).eps)
+		sigma_inv = (eig_vec * (eig_val ** -0.5)) @ eig_vec.T
+	# The whitening matrix is computed in double precision, while the
+	# whitening itself is carried out (and stored) in single precision
+	if args.device == 'cuda':
+		sigma_inv = sigma_inv.float()
+	else:
+		sigma_inv = sigma_inv.astype(np.float32)
+
+	### Whitening the data ###
+	# The whitening matrix is applied to the channel dimension of the
+	# contiguous (Image conditions × EEG repetitions) × EEG channels ×
+	# EEG time points data, avoiding transposed copies
+	whitened = []
+	for p in range(len(session_data)):
+		data = np.ascontiguousarray(session_data[p], dtype=np.float32)
+		data_flat = np.reshape(data, (-1,data.shape[2],data.shape[3]))
+		if args.device == 'cuda':
+			white_data = torch.matmul(sigma_inv, torch.from_numpy(
+				data_flat).to(args.device)).cpu().numpy()
+		else:
+			white_data = np.matmul(sigma_inv, data_flat)
+		whitened.append(white_data.reshape(data.shape))
+		del data, data_flat, white_data
+
+	### Output ###
+	return whitened[0], whitened[1]
+
+
 def save_prepr(args, whitened_test, whitened_train, img_conditions_train,
 	ch_names, times):
 	"""Merging the EEG data of all sessions together, shuffling the EEG
 	repetitions across sessions and reshaping the data to the format:
 	Image conditions × EGG repetitions × EEG channels × EEG time points.
 	Then, the data of both test and training EEG partitions is saved.
+	Each session is written directly into its shuffled repetitions of the
+	merged data (so no concatenated or shuffled copy of the data is made), and
+	is removed from the "whitened_test" and "whitened_train" lists once merged.
 
 	Parameters
 	----------
@@ -206,19 +488,28 @@ def save_prepr(args, whitened_test, whitened_train, img_conditions_train,
 	"""
 
 	import numpy as np
-	from sklearn.utils import shuffle
 	import os
 
+	# Random generator with a fixed seed for reproducible results
+	rng = np.random.default_rng(seed=20200220)
+
 	### Merging and saving the test data ###
-	for s in range(args.n_ses):
-		if s == 0:
-			merged_test = whitened_test[s]
-		else:
-			merged_test = np.append(merged_test, whitened_test[s], 1)
-	del whitened_test
-	# Shuffling the repetitions of different sessions
-	idx = shuffle(np.arange(0, merged_test.shape[1]))
-	merged_test = merged_test[:,idx]
+	# Shuffling the repetitions of different sessions, by drawing the shuffled
+	# position of each merged repetition
+	n_rep = sum(data.shape[1] for data in whitened_test)
+	rep_pos = rng.permutation(n_rep)
+	# Data matrix of shape:
+	# Image conditions × EGG repetitions × EEG channels × EEG time points
+	merged_test = np.empty((whitened_test[0].shape[0],n_rep)+
+		whitened_test[0].shape[2:], dtype=whitened_test[0].dtype)
+	# Each session is written directly into its shuffled repetitions, and then
+	# released
+	rep_start = 0
+	while len(whitened_test) > 0:
+		data = whitened_test.pop(0)
+		merged_test[:,rep_pos[rep_start:rep_start+data.shape[1]]] = data
+		rep_start += data.shape[1]
+		del data
 	# Inserting the data into a dictionary
 	test_dict = {
 		'preprocessed_eeg_data': merged_test,
@@ -238,30 +529,33 @@ def save_prepr(args, whitened_test, whitened_train, img_conditions_train,
 	del test_dict
 
 	### Merging and saving the training data ###
-	for s in range(args.n_ses):
-		if s == 0:
-			white_data = whitened_train[s]
-			img_cond = img_conditions_train[s]
-		else:
-			white_data = np.append(white_data, whitened_train[s], 0)
-			img_cond = np.append(img_cond, img_conditions_train[s], 0)
-	del whitened_train, img_conditions_train
+	# Ranking the data of each image condition across sessions (in session
+	# order), through a stable sort of the image conditions
+	img_cond = np.concatenate(img_conditions_train, axis=0)
+	unique_cond, cond_idx = np.unique(img_cond, return_inverse=True)
+	cond_rank = np.argsort(np.argsort(cond_idx, kind='stable')) - \
+		np.searchsorted(np.sort(cond_idx), cond_idx)
+	ses_rep = whitened_train[0].shape[1]
+	n_rep = len(img_cond) // len(unique_cond) * ses_rep
+	del img_cond, img_conditions_train
+	# Shuffling the repetitions of different sessions, by drawing the shuffled
+	# position of each merged repetition
+	rep_pos = rng.permutation(n_rep)
 	# Data matrix of shape:
 	# Image conditions × EGG repetitions × EEG channels × EEG time points
-	merged_train = np.zeros((len(np.unique(img_cond)), white_data.shape[1]*2,
-		white_data.shape[2],white_data.shape[3]))
-	for i in range(len(np.unique(img_cond))):
-		# Finding the indices of the selected category
-		idx = np.where(img_cond == i+1)[0]
-		for r in range(len(idx)):
-			if r == 0:
-				ordered_data = white_data[idx[r]]
-			else:
-				ordered_data = np.append(ordered_data, white_data[idx[r]], 0)
-		merged_train[i] = ordered_data
-	# Shuffling the repetitions of different sessions
-	idx = shuffle(np.arange(0, merged_train.shape[1]))
-	merged_train = merged_train[:,idx]
+	merged_train = np.empty((len(unique_cond),n_rep)+
+		whitened_train[0].shape[2:], dtype=whitened_train[0].dtype)
+	# Each session is written directly into the shuffled repetitions of its
+	# image conditions, and then released
+	cond_start = 0
+	while len(whitened_train) > 0:
+		data = whitened_train.pop(0)
+		ses_cond = slice(cond_start, cond_start+data.shape[0])
+		for r in range(ses_rep):
+			merged_train[cond_idx[ses_cond],rep_pos[cond_rank[ses_cond]*
+				ses_rep+r]] = data[:,r]
+		cond_start += data.shape[0]
+		del data
 	# Inserting the data into a dictionary
 	train_dict = {
 		'preprocessed_eeg_data': merged_train,